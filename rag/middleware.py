@@ -2,10 +2,11 @@
 Middleware to ensure RAG system is ready before processing requests.
 """
 
+from django.conf import settings
 from django.http import JsonResponse
 from django.shortcuts import render
-from django.urls import resolve
 from rag.services import get_rag_service
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,12 +33,8 @@ class RAGReadinessMiddleware:
     
     def _is_rag_request(self, request):
         """Check if the request is RAG-related."""
-        try:
-            resolver_match = resolve(request.path_info)
-            # Check if the request is for RAG app
-            return resolver_match.app_name == 'rag'
-        except:
-            return False
+        # A prefix test avoids walking the URLconf for static/admin requests
+        return request.path_info.startswith(settings.RAG_URL_PREFIXES)
     
     def _ensure_rag_ready(self):
         """Ensure RAG service is ready."""
@@ -70,18 +67,23 @@ class RAGReadinessMiddleware:
 class RAGWarmupMiddleware:
     """
     Middleware to warm up RAG service on application startup.
+
+    The warmup runs in a daemon thread started when the middleware is
+    constructed, so no request waits for it and a worker shutting down does
+    not wait for it either. Readiness of RAG requests is still checked by
+    RAGReadinessMiddleware.
     """
     
     def __init__(self, get_response):
         self.get_response = get_response
-        self.warmed_up = False
+        self.warmup_done = threading.Event()
+        threading.Thread(target=self._warmup, name='rag-warmup', daemon=True).start()
+
+    @property
+    def warmed_up(self):
+        return self.warmup_done.is_set()
         
     def __call__(self, request):
-        # Warm up on first request
-        if not self.warmed_up:
-            self._warmup()
-            self.warmed_up = True
-            
         response = self.get_response(request)
         return response
     
@@ -91,8 +93,15 @@ class RAGWarmupMiddleware:
             logger.info("Warming up RAG service...")
             rag_service = get_rag_service()
             if rag_service.is_ready():
+                # Run a few retrievals so index pages and the embedding
+                # client connection are warm before real queries arrive.
+                # The LLM is skipped to save API quota.
+                for question in settings.WARMUP_QUERIES:
+                    rag_service.retrieve(question)
                 logger.info("RAG service warmed up successfully")
             else:
                 logger.warning("RAG service warmup completed but system not ready")
         except Exception as e:
             logger.error(f"Error during RAG warmup: {e}")
+        finally:
+            self.warmup_done.set()
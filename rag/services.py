@@ -7,19 +7,702 @@ for querying sermon content using FAISS vectorstore and Google Gemini.
 
 import os
 import re
-import pandas as pd
-import numpy as np
+import logging
+import asyncio
+import pickle
+import functools
+import hashlib
+import bisect
+import itertools
+import uuid
+import queue
+import shutil
+from collections import OrderedDict
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
 from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores.faiss import FAISS
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+# Patterns used on every retrieved document, compiled once at import.
+# The timestamp forms accepted by _extract_timestamp, tried in this order:
+# "45s" anywhere, then "1:30" anywhere, then "1h 30m 45s" at the start. A unit
+# letter must not be followed by another letter, so words like "15minute"
+# are not read as timestamps while "1h30m" still is.
+_RE_TS_SECONDS = re.compile(r'(\d+)s(?!\w)')
+_RE_TS_MIN_SEC = re.compile(r'(\d+):(\d+)')
+_RE_TS_HMS = re.compile(
+    r'(?:(\d+)h(?![^\W\d])\s*)?(?:(\d+)m(?![^\W\d])\s*)?(?:(\d+)s(?!\w))?'
+)
+_RE_TS_MARKER = re.compile(r'\b\d+s\b')
+_RE_WS = re.compile(r'\s+')
+_RE_BOLD = re.compile(r'\*\*(.*?)\*\*')
+_RE_ITALIC = re.compile(r'\*(.*?)\*')
+
+# "598s music " markers stripped from the dataset. This is RE2 syntax, not
+# Python re: it only runs through pandas' Arrow string kernels, which hand it
+# to pyarrow's RE2 engine (linear time; \s matches ASCII whitespace only).
+# The flag is inline because those kernels take pattern text, not flags.
+_MUSIC_PATTERN = r'(?i)\d+s\s+music\s+'
+
+# Joins per-document strings so one regex call covers all retrieved docs.
+# NUL is neither whitespace nor a word character, so no pattern above can
+# match across it and \b / (?!\w) behave as they do at a string boundary.
+_SEGMENT_SEP = '\x00'
+
+# Size and overlap, in characters, of the chunks sermons are split into.
+# _format_docs passes up to _CHUNK_SIZE characters of each retrieved chunk to
+# the LLM, so the whole chunk reaches the prompt.
+_CHUNK_SIZE = 800
+_CHUNK_OVERLAP = 80
+
+# Length of the models/embedding-001 vectors the index is built from
+_EMBEDDING_DIMENSION = 768
+
+
+def _min_sec_timestamp(match: re.Match) -> str:
+    """Convert a _RE_TS_MIN_SEC match like "1:30" into seconds."""
+    return str(int(match.group(1)) * 60 + int(match.group(2)))
+
+
+def _hms_timestamp(search_text: str) -> str:
+    """Seconds for an "1h 30m 45s" timestamp at the start of the text, else "0"."""
+    hours, minutes, seconds = (
+        int(group or 0) for group in _RE_TS_HMS.match(search_text).groups()
+    )
+    total_seconds = hours * 3600 + minutes * 60 + seconds
+    # Default to 0 if no timestamp found
+    return str(total_seconds) if total_seconds > 0 else "0"
+
+
+def _timestamp_from_text(search_text: str) -> str:
+    """Find the timestamp in already lowercased text, in seconds ("0" if none)."""
+    # Simple seconds like "10s", "45s"
+    match = _RE_TS_SECONDS.search(search_text)
+    if match:
+        return match.group(1)
+
+    # Minutes:seconds like "1:30", "10:45"
+    match = _RE_TS_MIN_SEC.search(search_text)
+    if match:
+        return _min_sec_timestamp(match)
+
+    # Hours, minutes, seconds like "1h 30m 45s"
+    return _hms_timestamp(search_text)
+
+
+def _first_match_per_segment(pattern: re.Pattern, search_text: str,
+                             starts: List[int]) -> Dict[int, re.Match]:
+    """Map each _SEGMENT_SEP-joined segment to the first match of pattern in it."""
+    first_matches = {}
+    for match in pattern.finditer(search_text):
+        segment = bisect.bisect_right(starts, match.start()) - 1
+        first_matches.setdefault(segment, match)
+    return first_matches
+
+
+def _truncate_preview(cleaned: str, max_length: int) -> str:
+    """Truncate cleaned text to max_length at a word boundary, adding an ellipsis."""
+    if len(cleaned) > max_length:
+        cleaned = cleaned[:max_length].rsplit(' ', 1)[0] + "..."
+    return cleaned
+
+
+def _clean_contents(contents: List[str]) -> List[str]:
+    """
+    Remove timestamp markers and extra whitespace from several contents
+    with one regex pass over the joined text, without truncating.
+
+    Args:
+        contents (List[str]): Raw content from the documents
+
+    Returns:
+        List[str]: Cleaned contents
+    """
+    if not contents:
+        return []
+    if any(_SEGMENT_SEP in content for content in contents):
+        return [
+            _RE_WS.sub(' ', _RE_TS_MARKER.sub('', content)).strip()
+            for content in contents
+        ]
+
+    cleaned = _RE_WS.sub(' ', _RE_TS_MARKER.sub('', _SEGMENT_SEP.join(contents)))
+    return [text.strip() for text in cleaned.split(_SEGMENT_SEP)]
+
+
+def _doc_previews(docs: List[Document], max_length: int = 200) -> List[str]:
+    """Content previews for documents, using ingest-time cleaning when available."""
+    if all('clean_content' in doc.metadata for doc in docs):
+        return [
+            _truncate_preview(doc.metadata['clean_content'], max_length)
+            for doc in docs
+        ]
+    return [
+        _truncate_preview(text, max_length)
+        for text in _clean_contents([doc.page_content for doc in docs])
+    ]
+
+
+def _format_docs(docs: List[Document]) -> str:
+    """Format retrieved documents for context."""
+    # Clean the content, keeping up to a full chunk for context
+    contents = _doc_previews(docs, max_length=_CHUNK_SIZE)
+    return "\n".join(
+        f"Sermon {i}: {doc.metadata.get('title', 'Unknown Title')}\n{content}\n"
+        for i, (doc, content) in enumerate(zip(docs, contents), 1)
+    )
+
+
+def _pack_texts(texts: List[str]):
+    """Encode strings into one UTF-8 buffer plus offsets (n + 1 entries)."""
+    import numpy as np
+
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _unpack_texts(offsets, blob, ids) -> List[str]:
+    """Decode the strings at the given positions of a packed buffer."""
+    return [
+        blob[start:end].tobytes().decode('utf-8')
+        for start, end in zip(offsets[ids].tolist(), offsets[ids + 1].tolist())
+    ]
+
+
+class ChunkMetadata:
+    """
+    Chunk text and sermon metadata stored as parallel numpy arrays.
+
+    Row i describes the vector at position i of the FAISS index, so search
+    results map straight to metadata by fancy indexing instead of going
+    through the LangChain docstore. Chunk text is kept as one UTF-8 buffer
+    with offsets, and titles/authors/video ids once per sermon. Each chunk's
+    timestamp and timestamp-free text are computed at ingest, so queries do
+    no regex work on the retrieved chunks.
+    """
+
+    # Saved as one uncompressed .npy per array so they can be memory-mapped
+    # and shared between worker processes like the FAISS index
+    ARRAYS = (
+        "titles", "authors", "video_ids", "sermon_ids", "timestamps",
+        "text_offsets", "text_blob", "clean_offsets", "clean_blob",
+    )
+
+    def __init__(self, titles, authors, video_ids, sermon_ids, timestamps,
+                 text_offsets, text_blob, clean_offsets, clean_blob):
+        self.titles = titles
+        self.authors = authors
+        self.video_ids = video_ids
+        self.sermon_ids = sermon_ids
+        self.timestamps = timestamps
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob
+        self.clean_offsets = clean_offsets
+        self.clean_blob = clean_blob
+
+    @classmethod
+    def from_documents(cls, split_docs: List[Document], titles: List[str],
+                       authors: List[str], video_ids: List[str],
+                       timestamps: List[str], clean_texts: List[str]) -> 'ChunkMetadata':
+        """
+        Build the arrays from split documents in index order.
+
+        Args:
+            split_docs (List[Document]): Chunks, in the order they were indexed
+            titles, authors, video_ids (List[str]): Per-sermon values,
+                indexed by each chunk's doc_id
+            timestamps (List[str]): Timestamp in seconds of each chunk
+            clean_texts (List[str]): Each chunk with timestamp markers removed
+
+        Returns:
+            ChunkMetadata: Arrays describing every chunk
+        """
+        import numpy as np
+
+        text_offsets, text_blob = _pack_texts([doc.page_content for doc in split_docs])
+        clean_offsets, clean_blob = _pack_texts(clean_texts)
+        return cls(
+            titles=np.array(titles, dtype=str),
+            authors=np.array(authors, dtype=str),
+            video_ids=np.array(video_ids, dtype=str),
+            sermon_ids=np.array([doc.metadata['doc_id'] for doc in split_docs], dtype=np.int32),
+            timestamps=np.array([int(t) for t in timestamps], dtype=np.int64),
+            text_offsets=text_offsets,
+            text_blob=text_blob,
+            clean_offsets=clean_offsets,
+            clean_blob=clean_blob,
+        )
+
+    def __len__(self) -> int:
+        return len(self.text_offsets) - 1
+
+    def save(self, path: Path) -> None:
+        """Write the arrays into a vectorstore directory."""
+        import numpy as np
+
+        for name in self.ARRAYS:
+            np.save(path / f"metadata.{name}.npy", getattr(self, name))
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['ChunkMetadata']:
+        """Memory-map the arrays from a vectorstore directory, if they were saved."""
+        import numpy as np
+
+        files = {name: path / f"metadata.{name}.npy" for name in cls.ARRAYS}
+        if not all(f.exists() for f in files.values()):
+            return None
+        return cls(**{
+            name: np.load(f, mmap_mode='r') for name, f in files.items()
+        })
+
+    def documents(self, ids) -> List[Document]:
+        """
+        Build documents for FAISS result ids.
+
+        Besides the usual metadata, each document carries its precomputed
+        "timestamp" and "clean_content".
+
+        Args:
+            ids (np.ndarray): Index positions; -1 entries (no result) are skipped
+
+        Returns:
+            List[Document]: One document per valid id, in order
+        """
+        ids = ids[ids >= 0]
+        sermon_ids = self.sermon_ids[ids]
+        return [
+            Document(
+                page_content=text,
+                metadata={
+                    "title": title,
+                    "author": author,
+                    "video_id": video_id,
+                    "doc_id": doc_id,
+                    "timestamp": str(timestamp),
+                    "clean_content": clean_text
+                }
+            )
+            for text, clean_text, title, author, video_id, doc_id, timestamp in zip(
+                _unpack_texts(self.text_offsets, self.text_blob, ids),
+                _unpack_texts(self.clean_offsets, self.clean_blob, ids),
+                self.titles[sermon_ids].tolist(),
+                self.authors[sermon_ids].tolist(),
+                self.video_ids[sermon_ids].tolist(),
+                sermon_ids.tolist(),
+                self.timestamps[ids].tolist()
+            )
+        ]
+
+
+class ChunkDocstore:
+    """
+    Read-only docstore serving LangChain lookups from ChunkMetadata.
+
+    Document ids are the chunks' index positions. Loading a store with chunk
+    metadata uses this instead of unpickling the InMemoryDocstore, which
+    would rebuild every chunk as a Python object at startup.
+    """
+
+    def __init__(self, chunk_metadata: ChunkMetadata):
+        self.chunk_metadata = chunk_metadata
+
+    def search(self, search: int):
+        """Return the document at an index position, or a not-found message."""
+        import numpy as np
+
+        if not 0 <= search < len(self.chunk_metadata):
+            return f"ID {search} not found."
+        return self.chunk_metadata.documents(np.array([search]))[0]
+
+
+def _prefetch_file(path: Path) -> None:
+    """Ask the kernel to start reading a file into the page cache."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+@functools.lru_cache(maxsize=settings.CACHED_VC_NUM)
+def _load_vectorstore_files(path_str: str, version: str):
+    """
+    Read a saved FAISS index and its docstore from disk.
+
+    Cached per directory and store version, so repeated service constructions
+    in one process reuse the loaded index and a rebuilt store is re-read.
+    The index is memory-mapped read-only: pages are faulted in on demand and
+    shared between worker processes through the page cache. Stores with
+    chunk metadata have no pickled docstore (see _create_vectorstore); a
+    ChunkDocstore over the memory-mapped arrays takes its place. index.pkl is
+    only read for stores saved before the arrays existed.
+
+    Args:
+        path_str (str): Directory holding the store files (see _resolve_vectorstore)
+        version (str): Version of the store in that directory
+
+    Returns:
+        Tuple of (faiss index, docstore, index_to_docstore_id, chunk metadata
+        or None for stores saved without it)
+    """
+    import faiss
+
+    chunk_metadata = ChunkMetadata.load(Path(path_str))
+    # index.pkl is only read for stores saved without chunk metadata
+    files = ["index.faiss"] if chunk_metadata is not None else ["index.faiss", "index.pkl"]
+    # Start readahead on all files at once instead of one after the other
+    with ThreadPoolExecutor(max_workers=len(files)) as executor:
+        list(executor.map(
+            _prefetch_file, [Path(path_str) / name for name in files]
+        ))
+
+    index_file = str(Path(path_str) / "index.faiss")
+    try:
+        index = faiss.read_index(
+            index_file, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+        )
+    except RuntimeError as e:
+        logger.warning("Memory-mapped index load failed (%s), reading into memory", e)
+        index = faiss.read_index(index_file)
+    if chunk_metadata is not None:
+        docstore = ChunkDocstore(chunk_metadata)
+        # Docstore ids are index positions; a range maps them without
+        # building a Python dict entry per chunk
+        index_to_docstore_id = range(index.ntotal)
+    else:
+        with open(Path(path_str) / "index.pkl", "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+    return index, docstore, index_to_docstore_id, chunk_metadata
+
+
+def _run_coroutine(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    asyncio.run() refuses to start when the calling thread already runs an
+    event loop (e.g. a build triggered from an async view), so in that case
+    the coroutine gets its own loop on a helper thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def _normalize_question(question: str) -> str:
+    """Normalize a question for cache lookups: case-folded, single-spaced."""
+    return _RE_WS.sub(' ', question).strip().casefold()
+
+
+# File in VECTORSTORE_PATH naming the subdirectory that holds the live store
+_CURRENT_FILE = "CURRENT"
+_RE_STORE_VERSION = re.compile(r'[0-9a-f]{32}')
+
+
+def _resolve_vectorstore(vectorstore_path: Path):
+    """
+    Find the directory holding the live copy of a saved vectorstore.
+
+    Each build writes its files into a new subdirectory and then atomically
+    replaces the CURRENT file naming it, so a reader always gets the index
+    and metadata arrays of one build. Stores saved before that layout keep
+    their files directly in vectorstore_path, versioned by modification time.
+
+    Args:
+        vectorstore_path (Path): settings.VECTORSTORE_PATH
+
+    Returns:
+        Tuple of (directory with the store files, version string)
+    """
+    try:
+        version = (vectorstore_path / _CURRENT_FILE).read_text().strip()
+    except FileNotFoundError:
+        mtime = max(
+            (vectorstore_path / name).stat().st_mtime
+            for name in ("index.faiss", "index.pkl")
+        )
+        return vectorstore_path, f"mtime-{mtime}"
+    return vectorstore_path / version, version
+
+
+def _publish_vectorstore(vectorstore_path: Path, version: str) -> None:
+    """
+    Make a fully written version the live store and delete the older ones.
+
+    Processes that already mapped files of an older version keep using them;
+    their pages stay valid until unmapped even after the files are removed.
+    """
+    pointer_tmp = vectorstore_path / f"{_CURRENT_FILE}.{version}.tmp"
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, vectorstore_path / _CURRENT_FILE)
+
+    for entry in vectorstore_path.iterdir():
+        if (entry.is_dir() and entry.name != version
+                and _RE_STORE_VERSION.fullmatch(entry.name)):
+            shutil.rmtree(entry, ignore_errors=True)
+    # Files of a store saved in the old flat layout
+    legacy_files = ["index.faiss", "index.pkl"] + [
+        f"metadata.{name}.npy" for name in ChunkMetadata.ARRAYS
+    ]
+    for name in legacy_files:
+        (vectorstore_path / name).unlink(missing_ok=True)
+
+
+def _load_dataset(dataset_path: Path):
+    """
+    Read and clean the sermon dataset.
+
+    Rows without sermon text are dropped, and "music" markers left by the
+    transcription are stripped from the rest.
+
+    Args:
+        dataset_path (Path): CSV file with sermon, title, author and video_id columns
+
+    Returns:
+        pd.DataFrame: Arrow-backed columns with a fresh 0..n-1 index
+    """
+    import pandas as pd
+    import pyarrow.csv as pacsv
+
+    # pyarrow's multithreaded reader parses only the needed columns;
+    # ArrowDtype keeps them as Arrow strings without copying. Unlike pandas,
+    # pyarrow reads empty string fields as "" unless strings_can_be_null is set
+    table = pacsv.read_csv(
+        dataset_path,
+        convert_options=pacsv.ConvertOptions(
+            include_columns=['sermon', 'title', 'author', 'video_id'],
+            strings_can_be_null=True
+        )
+    )
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    # Clean the data
+    df = df.dropna(subset=['sermon'])
+    music_prefix = df['sermon'].str.slice(0, 6).str.lower().eq('music ')
+    df.loc[music_prefix, 'sermon'] = df.loc[music_prefix, 'sermon'].str.slice(6)
+    df['sermon'] = df['sermon'].str.replace(_MUSIC_PATTERN, '', regex=True)
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def _index_factory_string(num_vectors: int) -> str:
+    """
+    Choose the FAISS index_factory description for a corpus size.
+
+    FAISS_INDEX_FACTORY overrides the choice. Otherwise corpora of at least
+    FAISS_IVF_MIN_VECTORS get an inverted file, so each query scans nprobe of
+    nlist lists instead of every vector. Its codes follow FAISS_IVF_ENCODING:
+    "SQ8" (the default) stores one byte per dimension and computes distances
+    with FAISS's SIMD int8 kernels at near-flat recall, "SQfp16" halves the
+    float32 bytes read per distance with effectively unchanged rankings, and
+    "PQ" stores each 768-d float32 vector (3 KB) as a 32-byte code at a
+    clear cost in recall. Corpora too small to
+    train the quantizers are scanned exhaustively over fp16 codes, which
+    need no training.
+
+    Setting FAISS_INDEX_FACTORY to an HNSW description such as "HNSW32"
+    trades memory (full vectors plus the graph) for searches that visit
+    roughly log(N) vectors.
+    """
+    if settings.FAISS_INDEX_FACTORY:
+        return settings.FAISS_INDEX_FACTORY
+    if num_vectors >= settings.FAISS_IVF_MIN_VECTORS:
+        # Roughly 39 training points per centroid keeps k-means well fed
+        nlist = max(1, min(settings.FAISS_NLIST, num_vectors // 39))
+        encodings = {
+            "PQ": f"PQ{settings.FAISS_PQ_M}x8", "SQ8": "SQ8", "SQfp16": "SQfp16"
+        }
+        if settings.FAISS_IVF_ENCODING not in encodings:
+            raise ImproperlyConfigured(
+                f"FAISS_IVF_ENCODING must be one of {', '.join(encodings)}, "
+                f"not {settings.FAISS_IVF_ENCODING!r}"
+            )
+        return f"IVF{nlist},{encodings[settings.FAISS_IVF_ENCODING]}"
+    return "SQfp16"
+
+
+def _check_index_settings() -> None:
+    """
+    Fail fast on FAISS settings _build_faiss_index could not use.
+
+    Runs before the corpus is embedded, so a typo in FAISS_INDEX_FACTORY or
+    FAISS_IVF_ENCODING does not surface only after every chunk has been sent
+    to the embedding API. Building an empty index of the configured type is
+    enough for FAISS to reject an invalid description.
+
+    Raises:
+        ImproperlyConfigured: If the settings do not describe a valid index
+    """
+    import faiss
+
+    factory = _index_factory_string(settings.FAISS_IVF_MIN_VECTORS)
+    try:
+        faiss.index_factory(_EMBEDDING_DIMENSION, factory)
+    except RuntimeError as e:
+        raise ImproperlyConfigured(
+            f"Invalid FAISS index description {factory!r}: {e}"
+        ) from e
+
+
+def _configure_index(index) -> None:
+    """Apply search-time parameters from settings to a built or loaded index."""
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = settings.FAISS_NPROBE
+        ivf = faiss.downcast_index(ivf)
+        if isinstance(ivf, faiss.IndexIVFPQ):
+            # The precomputed table (nlist x M x 256 floats, 32 MB at the
+            # default sizes) is rebuilt in every process that loads the
+            # index. Computing its terms per query over a few probed lists
+            # is a small cost next to that memory
+            ivf.use_precomputed_table = -1
+            ivf.precomputed_table.resize(0)
+    hnsw = getattr(faiss.downcast_index(index), 'hnsw', None)
+    if hnsw is not None:
+        hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+
+
+class SearchBatcher:
+    """
+    Coalesces concurrent FAISS searches into batched index.search calls.
+
+    Callers queue their query and then take turns holding a lock. Whoever
+    holds it searches every query waiting at that moment as one (B, d)
+    matrix and hands each caller its rows, so a lone query is searched at
+    once, and queries that arrive while a search runs share the next one.
+    FAISS's per-call overhead and OpenMP fan-out are then paid once per batch
+    instead of once per request. No background thread is involved.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+    def search(self, query_vector, k: int):
+        """
+        Search one query vector, blocking until its batch has run.
+
+        Args:
+            query_vector (np.ndarray): float32 vector of shape (d,)
+            k (int): Number of neighbours to return
+
+        Returns:
+            Tuple of (distances, ids) arrays of length k
+        """
+        future = Future()
+        self._queue.put((query_vector, k, future))
+        with self._lock:
+            # A previous lock holder may already have searched this query
+            if not future.done():
+                self._search_pending()
+        return future.result()
+
+    def _search_pending(self):
+        """Search every queued query in one call. Must hold self._lock."""
+        import numpy as np
+
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        k = max(item_k for _, item_k, _ in batch)
+        try:
+            distances, ids = self.index.search(
+                np.vstack([query_vector for query_vector, _, _ in batch]), k
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for row, (_, item_k, future) in enumerate(batch):
+            future.set_result((distances[row, :item_k], ids[row, :item_k]))
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that memoizes query embeddings.
+
+    Repeated questions skip the embedding API round trip and go straight to
+    the FAISS search. Document embedding is passed through uncached.
+    """
+
+    def __init__(self, embeddings: Embeddings, maxsize: int = 1024):
+        self.embeddings = embeddings
+        self._embed_query_cached = functools.lru_cache(maxsize=maxsize)(
+            self._embed_query
+        )
+
+    def _embed_query(self, text: str) -> tuple:
+        return tuple(self.embeddings.embed_query(text))
+
+    def embed_query(self, text: str) -> List[float]:
+        return list(self._embed_query_cached(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+
+@functools.lru_cache(maxsize=None)
+def _google_clients(api_key: str, transport: str):
+    """
+    Create the Gemini embedding and chat clients once per process.
+
+    Each client holds one long-lived channel, so sharing them between
+    SermonRAGService instances reuses established connections (and the
+    query embedding cache) instead of opening new ones on re-initialization.
+
+    Args:
+        api_key (str): Google API key
+        transport (str): "grpc" or "rest"
+
+    Returns:
+        Tuple of (CachedQueryEmbeddings, ChatGoogleGenerativeAI)
+    """
+    from langchain_google_genai import (
+        ChatGoogleGenerativeAI,
+        GoogleGenerativeAIEmbeddings,
+    )
+
+    embeddings = CachedQueryEmbeddings(
+        GoogleGenerativeAIEmbeddings(
+            model="models/embedding-001",
+            google_api_key=api_key,
+            transport=transport
+        ),
+        maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE
+    )
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-1.5-flash",
+        temperature=0.0,
+        google_api_key=api_key,
+        transport=transport
+    )
+    return embeddings, llm
 
 
 class SermonRAGService:
@@ -31,24 +714,31 @@ class SermonRAGService:
         self.llm = None
         self.retriever = None
         self.rag_chain = None
+        self.chunk_metadata = None
+        self.search_batcher = None
+        self.store_version = None
+        # LRU of retrieved documents keyed on the normalized question; the
+        # service is rebuilt whenever the vectorstore changes, so entries
+        # never outlive their index
+        self._retrieval_cache = OrderedDict()
+        self._retrieval_cache_lock = threading.Lock()
         self._initialize_components()
     
     def _initialize_components(self):
         """Initialize all RAG components."""
         try:
-            # Initialize embeddings
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=settings.GOOGLE_API_KEY
+            # Initialize embeddings and LLM
+            self.embeddings, self.llm = _google_clients(
+                settings.GOOGLE_API_KEY, settings.GOOGLE_API_TRANSPORT
             )
             
-            # Initialize LLM
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash",
-                temperature=0.0,
-                google_api_key=settings.GOOGLE_API_KEY
+            # Split the cores between gunicorn workers so FAISS's OpenMP
+            # threads in each process do not oversubscribe the machine
+            import faiss
+            faiss.omp_set_num_threads(
+                max(1, (os.cpu_count() or 1) // settings.WEB_WORKERS)
             )
-            
+
             # Load or create vectorstore
             self._load_or_create_vectorstore()
             
@@ -59,107 +749,236 @@ class SermonRAGService:
                     search_kwargs={"k": 5}
                 )
                 
+                self.search_batcher = SearchBatcher(self.vectorstore.index)
+
                 # Create RAG chain
                 self._create_rag_chain()
                 
         except Exception as e:
-            print(f"Error initializing RAG components: {e}")
+            logger.error("Error initializing RAG components: %s", e)
             raise
     
     def _load_or_create_vectorstore(self):
         """Load existing vectorstore or create new one if not found."""
+        from langchain_community.vectorstores.faiss import FAISS
+
         vectorstore_path = settings.VECTORSTORE_PATH
         
         if vectorstore_path.exists():
             try:
-                print("Loading existing vectorstore...")
-                self.vectorstore = FAISS.load_local(
-                    str(vectorstore_path), 
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
+                logger.info("Loading existing vectorstore...")
+                store_dir, version = _resolve_vectorstore(vectorstore_path)
+                try:
+                    loaded = _load_vectorstore_files(str(store_dir), version)
+                except FileNotFoundError:
+                    # A rebuild can retire this version between resolving and
+                    # reading it; CURRENT then already names the new one
+                    store_dir, version = _resolve_vectorstore(vectorstore_path)
+                    loaded = _load_vectorstore_files(str(store_dir), version)
+                index, docstore, index_to_docstore_id, self.chunk_metadata = loaded
+                # Part of the answer cache key, so a rebuilt store never
+                # serves answers generated from the previous one
+                self.store_version = version
+                _configure_index(index)
+                self.vectorstore = FAISS(
+                    embedding_function=self.embeddings,
+                    index=index,
+                    docstore=docstore,
+                    index_to_docstore_id=index_to_docstore_id
                 )
-                print("✅ Vectorstore loaded successfully!")
+                logger.info("✅ Vectorstore loaded successfully!")
             except Exception as e:
-                print(f"Error loading vectorstore: {e}")
-                print("Creating new vectorstore...")
+                logger.error("Error loading vectorstore: %s", e)
+                logger.info("Creating new vectorstore...")
                 self._create_vectorstore()
         else:
-            print("Vectorstore not found. Creating new one...")
+            logger.info("Vectorstore not found. Creating new one...")
             self._create_vectorstore()
     
     def _create_vectorstore(self):
         """Create new vectorstore from sermon dataset."""
+        import faiss
+        import numpy as np
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores.faiss import FAISS
+
         try:
+            _check_index_settings()
             dataset_path = settings.DATASET_PATH
             if not dataset_path.exists():
                 raise FileNotFoundError(f"Dataset not found at {dataset_path}")
             
-            print("Loading sermon dataset...")
-            df = pd.read_csv(dataset_path)
-            
-            # Clean the data
-            df = df.dropna(subset=['sermon'])
-            df['sermon'] = df['sermon'].apply(
-                lambda x: x[6:] if x.lower().startswith('music ') else x
-            )
-            df['sermon'] = df['sermon'].apply(
-                lambda x: re.sub(r'\d+s\s+music\s+', '', x, 
-                                 flags=re.IGNORECASE))
-            if 'Unnamed: 0' in df.columns:
-                df.drop(columns=['Unnamed: 0'], inplace=True)
-            df.reset_index(drop=True, inplace=True)
+            logger.info("Loading sermon dataset...")
+            df = _load_dataset(dataset_path)
             
-            print(f"📊 Dataset loaded: {len(df)} sermons")
+            logger.info("📊 Dataset loaded: %d sermons", len(df))
             
-            # Convert to documents
-            documents = []
-            for index, row in df.iterrows():
-                doc = Document(
-                    page_content=row['sermon'],
-                    metadata={
-                        "title": row['title'],
-                        "author": row['author'],
-                        "video_id": row['video_id'],
-                        "doc_id": index
-                    }
-                )
-                documents.append(doc)
-            
-            # Split documents
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=500,
-                chunk_overlap=200,
-                length_function=len,
-                separators=["\n\n", "\n", " ", ""]
+            # Create vectorstore; sermons are split lazily, so chunking
+            # overlaps with the embedding requests already in flight
+            logger.info("⏳ Creating vector store... (this may take a few minutes)")
+            embedded = _run_coroutine(self._embed_batches(
+                self._iter_chunk_batches(df, settings.EMBEDDING_BATCH_SIZE)
+            ))
+            split_docs = [doc for batch, _ in embedded for doc in batch]
+            vectors = np.vstack([batch_vectors for _, batch_vectors in embedded])
+            logger.info("🔪 Split and embedded %d chunks in %d batches",
+                        len(split_docs), len(embedded))
+
+            index = self._build_faiss_index(vectors)
+            doc_ids = [str(uuid.uuid4()) for _ in split_docs]
+            self.vectorstore = FAISS(
+                embedding_function=self.embeddings,
+                index=index,
+                docstore=InMemoryDocstore(dict(zip(doc_ids, split_docs))),
+                index_to_docstore_id=dict(enumerate(doc_ids))
             )
-            split_docs = text_splitter.split_documents(documents)
-            print(f"🔪 Split into {len(split_docs)} chunks")
-            
-            # Create vectorstore
-            print("⏳ Creating vector store... (this may take a few minutes)")
-            self.vectorstore = FAISS.from_documents(
-                documents=split_docs[0:500],
-                embedding=self.embeddings
+            # Timestamps and cleaned text are extracted once here rather than
+            # on every query that retrieves the chunk
+            contents = [doc.page_content for doc in split_docs]
+            self.chunk_metadata = ChunkMetadata.from_documents(
+                split_docs,
+                titles=df['title'].fillna('').astype(str).tolist(),
+                authors=df['author'].fillna('').astype(str).tolist(),
+                video_ids=df['video_id'].fillna('').astype(str).tolist(),
+                timestamps=self._extract_timestamps(contents),
+                clean_texts=_clean_contents(contents)
             )
             
-            # Add remaining documents in batches
-            for i in range(500, len(split_docs), 100):
-                self.vectorstore.add_documents(split_docs[i:i+500])
-                if i % 1000 == 0:
-                    print(f"Processed {i}/{len(split_docs)} documents")
-            
             # Save vectorstore
             vectorstore_path = settings.VECTORSTORE_PATH
-            vectorstore_path.parent.mkdir(parents=True, exist_ok=True)
-            self.vectorstore.save_local(str(vectorstore_path))
-            print("💾 Vector store saved to disk")
+            version = uuid.uuid4().hex
+            # Write the whole store into its own directory, then publish it
+            # with one atomic rename (see _resolve_vectorstore)
+            store_dir = vectorstore_path / version
+            store_dir.mkdir(parents=True)
+            # The chunk metadata arrays replace the pickled docstore, which
+            # save_local would write as a second copy of every chunk's text
+            faiss.write_index(index, str(store_dir / "index.faiss"))
+            self.chunk_metadata.save(store_dir)
+            _publish_vectorstore(vectorstore_path, version)
+            self.store_version = version
+            logger.info("💾 Vector store saved to disk")
             
         except Exception as e:
-            print(f"Error creating vectorstore: {e}")
+            logger.error("Error creating vectorstore: %s", e)
             raise
     
+    def _build_faiss_index(self, vectors):
+        """
+        Build the FAISS index for the embedded chunks.
+
+        Args:
+            vectors (np.ndarray): One float32 embedding per chunk, in index order
+
+        Returns:
+            faiss.Index: Trained index containing every vector
+        """
+        import faiss
+        import numpy as np
+
+        xb = np.asarray(vectors, dtype=np.float32)
+        factory = _index_factory_string(len(xb))
+        logger.info("Building FAISS index '%s' for %d vectors", factory, len(xb))
+        index = faiss.index_factory(xb.shape[1], factory)
+        # Training (k-means) and encoding are parallel across vectors, and
+        # nothing else searches while the store is built, so use every core
+        # instead of this worker's share set in _initialize_components
+        search_threads = faiss.omp_get_max_threads()
+        faiss.omp_set_num_threads(os.cpu_count() or 1)
+        try:
+            if not index.is_trained:
+                rng = np.random.default_rng(0)
+                sample_size = min(len(xb), settings.FAISS_TRAIN_SIZE)
+                index.train(xb[rng.choice(len(xb), sample_size, replace=False)])
+            hnsw = getattr(index, 'hnsw', None)
+            if hnsw is not None:
+                hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+            index.add(xb)
+        finally:
+            faiss.omp_set_num_threads(search_threads)
+        _configure_index(index)
+        return index
+
+    def _iter_chunk_batches(self, df, batch_size: int) -> Iterator[List[Document]]:
+        """
+        Split sermons one at a time and yield the chunks in embedding batches.
+
+        Avoids building a Document for every sermon and the full chunk list
+        before embedding starts.
+
+        Args:
+            df (pd.DataFrame): Cleaned dataset with sermon, title, author and
+                video_id columns
+            batch_size (int): Chunks per batch
+
+        Yields:
+            List[Document]: Up to batch_size chunks, in corpus order
+        """
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=_CHUNK_SIZE,
+            chunk_overlap=_CHUNK_OVERLAP,
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""]
+        )
+        batch = []
+        for index, (sermon, title, author, video_id) in enumerate(zip(
+            df['sermon'].to_numpy(), df['title'].to_numpy(),
+            df['author'].to_numpy(), df['video_id'].to_numpy()
+        )):
+            document = Document(
+                page_content=sermon,
+                metadata={
+                    "title": title,
+                    "author": author,
+                    "video_id": video_id,
+                    "doc_id": index
+                }
+            )
+            for chunk in text_splitter.split_documents([document]):
+                batch.append(chunk)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    async def _embed_batches(self, batches: Iterable[List[Document]]) -> List[tuple]:
+        """
+        Embed document batches concurrently.
+
+        EMBEDDING_CONCURRENCY workers pull batches from the iterable as they
+        finish their previous request, so a generator is consumed lazily.
+
+        Args:
+            batches (Iterable[List[Document]]): Documents grouped into API-sized batches
+
+        Returns:
+            List[tuple]: (batch, float32 array of its vectors) pairs in input order
+        """
+        import numpy as np
+
+        results = {}
+        numbered = enumerate(batches)
+
+        async def _worker():
+            for position, batch in numbered:
+                vectors = await self.embeddings.aembed_documents(
+                    [doc.page_content for doc in batch]
+                )
+                # Convert as each response arrives rather than holding every
+                # vector as a list of Python floats until the index is built
+                results[position] = (batch, np.asarray(vectors, dtype=np.float32))
+
+        await asyncio.gather(*(_worker() for _ in range(settings.EMBEDDING_CONCURRENCY)))
+        return [results[position] for position in range(len(results))]
+
     def _create_rag_chain(self):
         """Create the RAG chain for question answering."""
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate
+
         # Define the RAG prompt template
         rag_prompt = ChatPromptTemplate.from_template("""
 You are a helpful assistant that answers questions based on sermon content from Zac Poonen.
@@ -176,24 +995,10 @@ Answer: Provide a thoughtful response based on the sermon content. Include relev
 or spiritual insights when mentioned in the context. Be helpful and encouraging in your tone.
 """)
         
-        # Create the RAG chain
-        self.rag_chain = (
-            {"context": self.retriever | self._format_docs, "question": RunnablePassthrough()}
-            | rag_prompt
-            | self.llm
-            | StrOutputParser()
-        )
+        # Create the RAG chain. It takes {"context", "question"} so callers
+        # retrieve once and reuse the documents for the source list.
+        self.rag_chain = rag_prompt | self.llm | StrOutputParser()
     
-    def _format_docs(self, docs: List[Document]) -> str:
-        """Format retrieved documents for context."""
-        formatted_context = []
-        for i, doc in enumerate(docs, 1):
-            title = doc.metadata.get('title', 'Unknown Title')
-            # Clean the content and limit to 500 characters for context
-            content = self._clean_content_preview(doc.page_content, max_length=500)
-            formatted_context.append(f"Sermon {i}: {title}\n{content}\n")
-        return "\n".join(formatted_context)
-
     def _extract_timestamp(self, content: str) -> str:
         """
         Extract timestamp from content.
@@ -210,41 +1015,41 @@ or spiritual insights when mentioned in the context. Be helpful and encouraging
             str: Timestamp in seconds for YouTube URL
         """
         # Look for various timestamp patterns in the first 100 characters
-        search_text = content[:100].lower()
-
-        # Pattern 1: Simple seconds like "10s", "45s"
-        seconds_match = re.search(r'(\d+)s(?!\w)', search_text)
-        if seconds_match:
-            return seconds_match.group(1)
-
-        # Pattern 2: Minutes:seconds like "1:30", "10:45"
-        time_match = re.search(r'(\d+):(\d+)', search_text)
-        if time_match:
-            minutes = int(time_match.group(1))
-            seconds = int(time_match.group(2))
-            total_seconds = minutes * 60 + seconds
-            return str(total_seconds)
-
-        # Pattern 3: Hours, minutes, seconds like "1h 30m 45s"
-        hms_match = re.search(r'(?:(\d+)h\s*)?(?:(\d+)m\s*)?(?:(\d+)s)?', search_text)
-        if hms_match and any(hms_match.groups()):
-            hours = int(hms_match.group(1) or 0)
-            minutes = int(hms_match.group(2) or 0)
-            seconds = int(hms_match.group(3) or 0)
-            total_seconds = hours * 3600 + minutes * 60 + seconds
-            if total_seconds > 0:
-                return str(total_seconds)
-
-        # Pattern 4: Look for time-like numbers at the beginning
-        start_time_match = re.search(r'^(\d{1,2}):(\d{2})', search_text)
-        if start_time_match:
-            minutes = int(start_time_match.group(1))
-            seconds = int(start_time_match.group(2))
-            total_seconds = minutes * 60 + seconds
-            return str(total_seconds)
-
-        # Default to 0 if no timestamp found
-        return "0"
+        return _timestamp_from_text(content[:100].lower())
+
+    def _extract_timestamps(self, contents: List[str]) -> List[str]:
+        """
+        Extract timestamps from several documents with one joined search text.
+
+        Equivalent to calling _extract_timestamp on each item.
+
+        Args:
+            contents (List[str]): The contents to search for timestamps
+
+        Returns:
+            List[str]: Timestamp in seconds for each content
+        """
+        prefixes = [content[:100].lower() for content in contents]
+        if any(_SEGMENT_SEP in prefix for prefix in prefixes):
+            return [_timestamp_from_text(prefix) for prefix in prefixes]
+
+        search_text = _SEGMENT_SEP.join(prefixes)
+        # Offset at which each prefix starts in search_text
+        starts = list(itertools.accumulate(
+            (len(prefix) + 1 for prefix in prefixes[:-1]), initial=0
+        ))
+        seconds = _first_match_per_segment(_RE_TS_SECONDS, search_text, starts)
+        min_secs = _first_match_per_segment(_RE_TS_MIN_SEC, search_text, starts)
+
+        timestamps = []
+        for segment, prefix in enumerate(prefixes):
+            if segment in seconds:
+                timestamps.append(seconds[segment].group(1))
+            elif segment in min_secs:
+                timestamps.append(_min_sec_timestamp(min_secs[segment]))
+            else:
+                timestamps.append(_hms_timestamp(prefix))
+        return timestamps
 
     def _create_youtube_link(self, video_id: str, timestamp: str = "0") -> str:
         """
@@ -280,19 +1085,19 @@ or spiritual insights when mentioned in the context. Be helpful and encouraging
             str: Cleaned content preview
         """
         # Remove timestamp markers like "598s", "601s", etc.
-        cleaned = re.sub(r'\b\d+s\b', '', content)
+        cleaned = _RE_TS_MARKER.sub('', content)
 
         # Remove extra whitespace that might be left after removing timestamps
-        cleaned = re.sub(r'\s+', ' ', cleaned)
+        cleaned = _RE_WS.sub(' ', cleaned)
 
-        # Remove leading/trailing whitespace
-        cleaned = cleaned.strip()
+        # Remove leading/trailing whitespace, then truncate to max length
+        return _truncate_preview(cleaned.strip(), max_length)
 
-        # Truncate to max length and add ellipsis if needed
-        if len(cleaned) > max_length:
-            cleaned = cleaned[:max_length].rsplit(' ', 1)[0] + "..."
-
-        return cleaned
+    def _doc_timestamps(self, docs: List[Document]) -> List[str]:
+        """Timestamps for documents, using ingest-time extraction when available."""
+        if all('timestamp' in doc.metadata for doc in docs):
+            return [doc.metadata['timestamp'] for doc in docs]
+        return self._extract_timestamps([doc.page_content for doc in docs])
 
     def _format_timestamp_display(self, timestamp_seconds: str) -> str:
         """
@@ -332,16 +1137,131 @@ or spiritual insights when mentioned in the context. Be helpful and encouraging
             str: Formatted response with HTML tags
         """
         # Convert **text** to <b>text</b> for bold formatting
-        formatted = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', response)
+        formatted = _RE_BOLD.sub(r'<b>\1</b>', response)
 
         # Convert *text* to <i>text</i> for italic formatting
-        formatted = re.sub(r'\*(.*?)\*', r'<i>\1</i>', formatted)
+        formatted = _RE_ITALIC.sub(r'<i>\1</i>', formatted)
 
         # Convert line breaks to HTML line breaks for better web display
         formatted = formatted.replace('\n', '<br>')
 
         return formatted
     
+    def retrieve(self, question: str) -> List[Document]:
+        """
+        Retrieve the chunks most similar to a question.
+
+        Searches the FAISS index directly, batched with concurrent queries,
+        and builds documents from the chunk metadata arrays. Stores saved without those arrays fall back
+        to the LangChain retriever. Results are memoized per normalized question.
+
+        Args:
+            question (str): The question to search for
+
+        Returns:
+            List[Document]: The top-k matching chunks
+        """
+        # Only the cache key is normalized; the question is embedded as asked
+        key = _normalize_question(question)
+        with self._retrieval_cache_lock:
+            cached = self._retrieval_cache.get(key)
+            if cached is not None:
+                self._retrieval_cache.move_to_end(key)
+                return list(cached)
+
+        docs = self._retrieve_uncached(question)
+        with self._retrieval_cache_lock:
+            self._retrieval_cache[key] = docs
+            self._retrieval_cache.move_to_end(key)
+            if len(self._retrieval_cache) > settings.RETRIEVAL_CACHE_SIZE:
+                self._retrieval_cache.popitem(last=False)
+        return list(docs)
+
+    def _retrieve_uncached(self, question: str) -> tuple:
+        """Retrieve the chunks for a question without consulting the cache."""
+        if self.chunk_metadata is None:
+            return tuple(self.retriever.invoke(question))
+
+        import numpy as np
+
+        query_vector = np.asarray(
+            self.embeddings.embed_query(question), dtype=np.float32
+        )
+        _, ids = self.search_batcher.search(
+            query_vector, self.retriever.search_kwargs["k"]
+        )
+        return tuple(self.chunk_metadata.documents(ids))
+
+    def _format_sources(self, relevant_docs: List[Document]) -> List[Dict[str, Any]]:
+        """
+        Format retrieved documents as deduplicated sources with YouTube links.
+
+        Args:
+            relevant_docs (List[Document]): Documents returned by the retriever
+
+        Returns:
+            List[Dict[str, Any]]: Source information for display
+        """
+        unique_docs = []
+        seen_sources = set()  # Track unique source combinations
+        
+        for doc in relevant_docs:
+            # Create unique identifier for deduplication
+            metadata = doc.metadata
+            source_key = f"{metadata.get('video_id', '')}_{metadata.get('title', 'Unknown Title')}"
+            
+            # Skip if we've already seen this source
+            if source_key in seen_sources:
+                continue
+            
+            seen_sources.add(source_key)
+            unique_docs.append(doc)
+
+        timestamps = self._doc_timestamps(unique_docs)
+        previews = _doc_previews(unique_docs)
+
+        sources = []
+        for doc, timestamp, preview in zip(unique_docs, timestamps, previews):
+            metadata = doc.metadata
+            video_id = metadata.get('video_id', '')
+            sources.append({
+                'title': metadata.get('title', 'Unknown Title'),
+                'author': metadata.get('author', 'Unknown Author'),
+                'video_id': video_id,
+                'timestamp': timestamp,
+                'timestamp_display': self._format_timestamp_display(timestamp),
+                'youtube_link': self._create_youtube_link(video_id, timestamp),
+                'content_preview': preview
+            })
+
+        return sources
+
+    def _build_result(self, question: str, raw_answer: str,
+                      relevant_docs: List[Document]) -> Dict[str, Any]:
+        """Assemble the query response from the LLM answer and retrieved documents."""
+        sources = self._format_sources(relevant_docs)
+        return {
+            'question': question,
+            'answer': self._format_llm_response(raw_answer),
+            'sources': sources,
+            'num_sources': len(sources)
+        }
+
+    def _answer_cache_key(self, question: str) -> str:
+        """Django cache key for the answer to a question on the current store."""
+        digest = hashlib.sha256(_normalize_question(question).encode('utf-8')).hexdigest()
+        return f"rag:answer:{self.store_version}:{digest}"
+
+    def _error_result(self, question: str, error: Exception) -> Dict[str, Any]:
+        """Build the response returned when a query fails."""
+        logger.error("Error processing query: %s", error)
+        return {
+            'question': question,
+            'answer': f"Sorry, I encountered an error while processing your question: {str(error)}",
+            'sources': [],
+            'num_sources': 0
+        }
+    
     def query(self, question: str) -> Dict[str, Any]:
         """
         Query the RAG system with a question.
@@ -356,61 +1276,59 @@ or spiritual insights when mentioned in the context. Be helpful and encouraging
             raise RuntimeError("RAG system not properly initialized")
         
         try:
-            # Get relevant documents
-            relevant_docs = self.retriever.get_relevant_documents(question)
+            cache_key = self._answer_cache_key(question)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return {**cached, 'question': question}
+
+            # Retrieve once; the same documents feed the prompt and the sources
+            relevant_docs = self.retrieve(question)
             
             # Generate answer
-            raw_answer = self.rag_chain.invoke(question)
+            raw_answer = self.rag_chain.invoke({
+                "context": _format_docs(relevant_docs),
+                "question": question
+            })
+
+            result = self._build_result(question, raw_answer, relevant_docs)
+            cache.set(cache_key, result, settings.ANSWER_CACHE_TIMEOUT)
+            return result
+            
+        except Exception as e:
+            return self._error_result(question, e)
 
-            # Format the answer for better display
-            answer = self._format_llm_response(raw_answer)
+    async def query_async(self, question: str) -> Dict[str, Any]:
+        """
+        Async variant of query() for use from async views.
+
+        Args:
+            question (str): The question to ask
+
+        Returns:
+            Dict containing the answer and source information
+        """
+        if not self.rag_chain:
+            raise RuntimeError("RAG system not properly initialized")
+
+        try:
+            cache_key = self._answer_cache_key(question)
+            cached = await cache.aget(cache_key)
+            if cached is not None:
+                return {**cached, 'question': question}
+
+            relevant_docs = await asyncio.to_thread(self.retrieve, question)
+
+            raw_answer = await self.rag_chain.ainvoke({
+                "context": _format_docs(relevant_docs),
+                "question": question
+            })
+
+            result = self._build_result(question, raw_answer, relevant_docs)
+            await cache.aset(cache_key, result, settings.ANSWER_CACHE_TIMEOUT)
+            return result
 
-            # Format sources with YouTube links and deduplicate
-            sources = []
-            seen_sources = set()  # Track unique source combinations
-            
-            for doc in relevant_docs:
-                video_id = doc.metadata.get('video_id', '')
-                title = doc.metadata.get('title', 'Unknown Title')
-                
-                # Create unique identifier for deduplication
-                source_key = f"{video_id}_{title}"
-                
-                # Skip if we've already seen this source
-                if source_key in seen_sources:
-                    continue
-                
-                seen_sources.add(source_key)
-                
-                timestamp = self._extract_timestamp(doc.page_content)
-                youtube_link = self._create_youtube_link(video_id, timestamp)
-
-                source_info = {
-                    'title': title,
-                    'author': doc.metadata.get('author', 'Unknown Author'),
-                    'video_id': video_id,
-                    'timestamp': timestamp,
-                    'timestamp_display': self._format_timestamp_display(timestamp),
-                    'youtube_link': youtube_link,
-                    'content_preview': self._clean_content_preview(doc.page_content)
-                }
-                sources.append(source_info)
-            
-            return {
-                'question': question,
-                'answer': answer,
-                'sources': sources,
-                'num_sources': len(sources)
-            }
-            
         except Exception as e:
-            print(f"Error processing query: {e}")
-            return {
-                'question': question,
-                'answer': f"Sorry, I encountered an error while processing your question: {str(e)}",
-                'sources': [],
-                'num_sources': 0
-            }
+            return self._error_result(question, e)
     
     def is_ready(self) -> bool:
         """Check if the RAG system is ready to handle queries."""
@@ -443,28 +1361,37 @@ or spiritual insights when mentioned in the context. Be helpful and encouraging
         return status
 
 
-# Global instance - Initialize immediately at startup
-print("🚀 Initializing RAG service at startup...")
-try:
-    _rag_service = SermonRAGService()
-    if _rag_service.is_ready():
-        print("✅ RAG service initialized successfully!")
-        # Get document count for status
-        status = _rag_service.get_vectorstore_status()
+# Guards creation of the global instance so concurrent first requests build
+# the service (and load the index) only once
+_rag_service_lock = threading.Lock()
+
+# Global instance, created on first use so that importing this module (URL
+# loading, management commands, tests) does not build the Gemini clients or
+# load the index
+_rag_service: Optional[SermonRAGService] = None
+
+
+def _log_service_status(rag_service: SermonRAGService) -> None:
+    """Log whether a newly created service is ready and how large its store is."""
+    if rag_service.is_ready():
+        logger.info("✅ RAG service initialized successfully!")
+        status = rag_service.get_vectorstore_status()
         if 'document_count' in status and status['document_count'] != 'unknown':
-            print(f"📚 Vectorstore loaded with {status['document_count']} documents")
+            logger.info("📚 Vectorstore loaded with %s documents", status['document_count'])
     else:
-        print("⚠️ RAG service initialized but not fully ready")
-except Exception as e:
-    print(f"❌ Failed to initialize RAG service at startup: {e}")
-    _rag_service = None
+        logger.warning("⚠️ RAG service initialized but not fully ready")
+
 
 def get_rag_service() -> SermonRAGService:
-    """Get the global RAG service instance."""
+    """Get the global RAG service instance, creating it on first use."""
     global _rag_service
     if _rag_service is None:
-        print("🔄 Creating RAG service instance...")
-        _rag_service = SermonRAGService()
+        with _rag_service_lock:
+            if _rag_service is None:
+                logger.info("🔄 Creating RAG service instance...")
+                rag_service = SermonRAGService()
+                _log_service_status(rag_service)
+                _rag_service = rag_service
     return _rag_service
 
 
@@ -480,63 +1407,38 @@ def query_sermons(question: str, show_sources: bool = True):
     Returns:
         str: The generated answer
     """
-    print(f"❓ Question: {question}")
-    print("🔍 Searching for relevant content...")
+    logger.info("❓ Question: %s", question)
+    logger.info("🔍 Searching for relevant content...")
 
     # Get RAG service
     rag_service = get_rag_service()
 
     if not rag_service.is_ready():
-        print("❌ RAG system is not ready. Please check your configuration.")
+        logger.error("❌ RAG system is not ready. Please check your configuration.")
         return "RAG system is not ready. Please check your configuration."
 
     try:
-        # Get relevant documents
-        relevant_docs = rag_service.retriever.get_relevant_documents(question)
-
-        if show_sources:
-            print("\n📚 Sources found:")
-            seen_sources = set()  # Track unique source combinations
-            source_count = 0
-            
-            for doc in relevant_docs:
-                title = doc.metadata.get('title', 'Unknown Title')
-                video_id = doc.metadata.get('video_id', '')
-                
-                # Create unique identifier for deduplication
-                source_key = f"{video_id}_{title}"
-                
-                # Skip if we've already seen this source
-                if source_key in seen_sources:
-                    continue
-                
-                seen_sources.add(source_key)
-                source_count += 1
-
-                # Extract timestamp using the service method
-                timestamp = rag_service._extract_timestamp(doc.page_content)
-
-                # Create YouTube link with timestamp
-                youtube_link = rag_service._create_youtube_link(video_id, timestamp)
-
-                if youtube_link:
-                    print(f"{source_count}. {title} - [Watch Video]({youtube_link})")
-                else:
-                    print(f"{source_count}. {title} - (No video link available)")
-
-        # Generate answer using the service
+        # One retrieval + generation; the result already carries the sources
         result = rag_service.query(question)
         answer = result['answer']
 
-        print("\n🤖 Generating answer...")
-        print("\n💬 Answer:")
-        print(answer)
+        if show_sources and logger.isEnabledFor(logging.INFO):
+            logger.info("📚 Sources found:")
+            for source_count, source in enumerate(result['sources'], 1):
+                if source['youtube_link']:
+                    logger.info("%d. %s - [Watch Video](%s)",
+                                source_count, source['title'], source['youtube_link'])
+                else:
+                    logger.info("%d. %s - (No video link available)",
+                                source_count, source['title'])
+
+        logger.info("💬 Answer:\n%s", answer)
 
         return answer
 
     except Exception as e:
         error_msg = f"Error processing query: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         return error_msg
 
 
@@ -544,21 +1446,15 @@ def initialize_rag_service():
     """Explicitly initialize the RAG service. Useful for startup scripts."""
     global _rag_service
     if _rag_service is None or not _rag_service.is_ready():
-        print("🔄 Initializing RAG service...")
-        _rag_service = SermonRAGService()
-        if _rag_service.is_ready():
-            print("✅ RAG service ready!")
-            return True
-        else:
-            print("❌ RAG service failed to initialize properly")
-            return False
-    else:
-        print("✅ RAG service already initialized and ready")
-        return True
-
-
-# Final startup message
-if _rag_service and _rag_service.is_ready():
-    print("🎉 RAG services module loaded successfully!")
-else:
-    print("⚠️ RAG services module loaded but service may need initialization")
+        with _rag_service_lock:
+            if _rag_service is None or not _rag_service.is_ready():
+                logger.info("🔄 Initializing RAG service...")
+                _rag_service = SermonRAGService()
+                if _rag_service.is_ready():
+                    logger.info("✅ RAG service ready!")
+                    return True
+                else:
+                    logger.error("❌ RAG service failed to initialize properly")
+                    return False
+    logger.info("✅ RAG service already initialized and ready")
+    return True
@@ -1,3 +1,296 @@
-from django.test import TestCase
+import random
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-# Create your tests here.
+import faiss
+import numpy as np
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from langchain_core.documents import Document
+
+from rag.services import (
+    _CHUNK_SIZE, ChunkDocstore, ChunkMetadata, SearchBatcher, SermonRAGService,
+    _check_index_settings, _clean_contents, _format_docs, _load_dataset,
+    _load_vectorstore_files, _publish_vectorstore, _resolve_vectorstore
+)
+
+
+def _text_service():
+    """A service for exercising the text helpers, without clients or an index."""
+    return SermonRAGService.__new__(SermonRAGService)
+
+
+class ExtractTimestampTests(SimpleTestCase):
+    def setUp(self):
+        self.service = _text_service()
+
+    def test_seconds_marker(self):
+        self.assertEqual(self.service._extract_timestamp("598s and so we see"), "598")
+
+    def test_minutes_seconds(self):
+        self.assertEqual(self.service._extract_timestamp("at 1:30 he said"), "90")
+
+    def test_hours_minutes_seconds_at_start(self):
+        self.assertEqual(self.service._extract_timestamp("1h 30m into the talk"), "5400")
+        self.assertEqual(self.service._extract_timestamp("1h30m into the talk"), "5400")
+
+    def test_no_timestamp(self):
+        self.assertEqual(self.service._extract_timestamp("Grace and peace to you"), "0")
+
+    def test_units_inside_words_are_not_timestamps(self):
+        self.assertEqual(self.service._extract_timestamp("a 15minute sermon"), "0")
+        self.assertEqual(self.service._extract_timestamp("10minute talk"), "0")
+        self.assertEqual(self.service._extract_timestamp("45sec of silence"), "0")
+
+    def test_seconds_marker_wins_over_verse_reference(self):
+        self.assertEqual(
+            self.service._extract_timestamp("John 3:16 says God so loved 45s the world"),
+            "45"
+        )
+
+    def test_only_searches_first_100_characters(self):
+        self.assertEqual(self.service._extract_timestamp("x" * 100 + " 45s"), "0")
+
+
+class BatchedTextHelperTests(SimpleTestCase):
+    """The joined-text batch helpers must agree with their per-item versions."""
+
+    ALPHABET = "0123456789smh: \n\tab.\x00"
+
+    def setUp(self):
+        self.service = _text_service()
+        self.rng = random.Random(0)
+
+    def _random_contents(self):
+        return [
+            "".join(self.rng.choice(self.ALPHABET) for _ in range(self.rng.randrange(150)))
+            for _ in range(self.rng.randrange(8))
+        ]
+
+    def test_extract_timestamps_matches_per_item(self):
+        for _ in range(500):
+            contents = self._random_contents()
+            self.assertEqual(
+                self.service._extract_timestamps(contents),
+                [self.service._extract_timestamp(content) for content in contents]
+            )
+
+    def test_clean_contents_matches_per_item(self):
+        for _ in range(500):
+            contents = self._random_contents()
+            self.assertEqual(
+                _clean_contents(contents),
+                [self.service._clean_content_preview(content, len(content))
+                 for content in contents]
+            )
+
+    def test_nul_in_content(self):
+        contents = ["12s a\x00b", "x 1:30\x00 5s"]
+        self.assertEqual(self.service._extract_timestamps(contents), ["12", "5"])
+        self.assertEqual(_clean_contents(contents), ["a\x00b", "x 1:30\x00"])
+
+
+class FormatDocsTests(SimpleTestCase):
+    def test_full_chunk_reaches_context(self):
+        content = " ".join(["word"] * (_CHUNK_SIZE // 5))
+        doc = Document(page_content=content, metadata={"title": "Grace"})
+        self.assertEqual(_format_docs([doc]), f"Sermon 1: Grace\n{content}\n")
+
+
+class LoadDatasetTests(SimpleTestCase):
+    def test_rows_without_sermon_are_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dataset_path = Path(tmp, "sermons.csv")
+            dataset_path.write_text(
+                "sermon,title,author,video_id,extra\n"
+                "Music 12s music Grace,First,Zac Poonen,vid0,x\n"
+                ",Empty,Zac Poonen,vid1,x\n"
+                '"",Quoted,Zac Poonen,vid2,x\n'
+                "Peace,,,vid3,x\n"
+            )
+            df = _load_dataset(dataset_path)
+        self.assertEqual(list(df.columns), ["sermon", "title", "author", "video_id"])
+        self.assertEqual(df['sermon'].tolist(), ["Grace", "Peace"])
+        self.assertEqual(df['video_id'].tolist(), ["vid0", "vid3"])
+        self.assertEqual(df['title'].fillna('').tolist(), ["First", ""])
+        self.assertEqual(list(df.index), [0, 1])
+
+
+class IndexSettingsTests(SimpleTestCase):
+    def test_default_settings_are_valid(self):
+        _check_index_settings()
+
+    @override_settings(FAISS_INDEX_FACTORY="", FAISS_IVF_ENCODING="SQ4x")
+    def test_unknown_ivf_encoding(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "FAISS_IVF_ENCODING"):
+            _check_index_settings()
+
+    @override_settings(FAISS_INDEX_FACTORY="IVF1024,PQ33")
+    def test_invalid_index_factory(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "'IVF1024,PQ33'"):
+            _check_index_settings()
+
+
+class ChunkMetadataTests(SimpleTestCase):
+    def setUp(self):
+        chunks = [
+            Document(page_content="598s Grâce et paix", metadata={"doc_id": 0}),
+            Document(page_content="1:30 神の愛", metadata={"doc_id": 1}),
+            Document(page_content="plain text", metadata={"doc_id": 1}),
+        ]
+        metadata = ChunkMetadata.from_documents(
+            chunks,
+            titles=["Première", "Second"],
+            authors=["Zac Poonen", "Zac Poonen"],
+            video_ids=["vid0", "vid1"],
+            timestamps=["598", "90", "0"],
+            clean_texts=["Grâce et paix", "1:30 神の愛", "plain text"],
+        )
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        metadata.save(Path(self.tmp.name))
+        self.loaded = ChunkMetadata.load(Path(self.tmp.name))
+
+    def test_load_memory_maps_arrays(self):
+        self.assertEqual(len(self.loaded), 3)
+        self.assertIsInstance(self.loaded.text_blob, np.memmap)
+
+    def test_documents_round_trip(self):
+        docs = self.loaded.documents(np.array([2, -1, 0, 1]))
+        self.assertEqual(
+            [doc.page_content for doc in docs],
+            ["plain text", "598s Grâce et paix", "1:30 神の愛"]
+        )
+        self.assertEqual(docs[1].metadata, {
+            "title": "Première",
+            "author": "Zac Poonen",
+            "video_id": "vid0",
+            "doc_id": 0,
+            "timestamp": "598",
+            "clean_content": "Grâce et paix",
+        })
+        self.assertEqual(docs[2].metadata["title"], "Second")
+        self.assertEqual(docs[2].metadata["timestamp"], "90")
+
+    def test_missing_arrays_load_as_none(self):
+        Path(self.tmp.name, "metadata.clean_blob.npy").unlink()
+        self.assertIsNone(ChunkMetadata.load(Path(self.tmp.name)))
+
+    def test_docstore_search(self):
+        docstore = ChunkDocstore(self.loaded)
+        self.assertEqual(docstore.search(1).page_content, "1:30 神の愛")
+        self.assertEqual(docstore.search(3), "ID 3 not found.")
+        self.assertEqual(docstore.search(-1), "ID -1 not found.")
+
+
+class LoadVectorstoreFilesTests(SimpleTestCase):
+    def test_loads_index_and_metadata_without_pickle(self):
+        from langchain_community.vectorstores.faiss import FAISS
+
+        chunks = [
+            Document(page_content=f"chunk {i}", metadata={"doc_id": 0}) for i in range(4)
+        ]
+        vectors = np.eye(4, 8, dtype=np.float32)
+        index = faiss.IndexFlatL2(8)
+        index.add(vectors)
+        with tempfile.TemporaryDirectory() as tmp:
+            faiss.write_index(index, str(Path(tmp, "index.faiss")))
+            ChunkMetadata.from_documents(
+                chunks, titles=["Grace"], authors=["Zac Poonen"], video_ids=["vid0"],
+                timestamps=["0"] * 4, clean_texts=[doc.page_content for doc in chunks]
+            ).save(Path(tmp))
+            loaded_index, docstore, index_to_docstore_id, _ = _load_vectorstore_files(tmp, "v1")
+            vectorstore = FAISS(
+                embedding_function=None, index=loaded_index, docstore=docstore,
+                index_to_docstore_id=index_to_docstore_id
+            )
+            docs = vectorstore.similarity_search_by_vector(vectors[2].tolist(), k=1)
+        self.assertEqual(docs[0].page_content, "chunk 2")
+        self.assertEqual(docs[0].metadata["title"], "Grace")
+
+
+class VectorstoreLayoutTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name)
+
+    def _write_version(self, version):
+        (self.path / version).mkdir()
+        (self.path / version / "index.faiss").write_text(version)
+        _publish_vectorstore(self.path, version)
+
+    def test_publish_switches_version_and_removes_old_ones(self):
+        self._write_version("a" * 32)
+        self._write_version("b" * 32)
+        self.assertEqual(_resolve_vectorstore(self.path), (self.path / ("b" * 32), "b" * 32))
+        self.assertFalse((self.path / ("a" * 32)).exists())
+        self.assertEqual(
+            sorted(entry.name for entry in self.path.iterdir()), ["CURRENT", "b" * 32]
+        )
+
+    def test_flat_layout_is_still_resolved_and_replaced(self):
+        (self.path / "index.faiss").write_text("old")
+        (self.path / "index.pkl").write_text("old")
+        store_dir, version = _resolve_vectorstore(self.path)
+        self.assertEqual(store_dir, self.path)
+        self.assertTrue(version.startswith("mtime-"))
+
+        self._write_version("c" * 32)
+        self.assertFalse((self.path / "index.faiss").exists())
+        self.assertEqual(_resolve_vectorstore(self.path)[1], "c" * 32)
+
+
+class _RecordingRetriever:
+    def __init__(self):
+        self.questions = []
+
+    def invoke(self, question):
+        self.questions.append(question)
+        return []
+
+
+class RetrieveCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.service = _text_service()
+        self.service._retrieval_cache = OrderedDict()
+        self.service._retrieval_cache_lock = threading.Lock()
+        self.service.chunk_metadata = None
+        self.service.retriever = _RecordingRetriever()
+
+    def test_normalized_repeat_is_served_from_cache(self):
+        self.service.retrieve("What is  Grace?")
+        self.service.retrieve("what is grace?")
+        self.assertEqual(len(self.service.retriever.questions), 1)
+
+    def test_question_is_retrieved_as_asked(self):
+        self.service.retrieve("What is  Grace?")
+        self.assertEqual(self.service.retriever.questions, ["What is  Grace?"])
+
+
+class SearchBatcherTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.random((200, 16), dtype=np.float32)
+        self.index = faiss.IndexFlatL2(16)
+        self.index.add(self.vectors)
+        self.batcher = SearchBatcher(self.index)
+
+    def test_single_search_matches_index(self):
+        distances, ids = self.batcher.search(self.vectors[3], 5)
+        expected_distances, expected_ids = self.index.search(self.vectors[3:4], 5)
+        np.testing.assert_array_equal(ids, expected_ids[0])
+        np.testing.assert_allclose(distances, expected_distances[0])
+
+    def test_concurrent_searches_get_their_own_rows(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda i: self.batcher.search(self.vectors[i], 1 + i % 5), range(64)
+            ))
+        for i, (_, ids) in enumerate(results):
+            self.assertEqual(len(ids), 1 + i % 5)
+            self.assertEqual(ids[0], i)
@@ -166,11 +166,66 @@ else:
 
 # Google API Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# Transport for the Gemini clients: "grpc" (persistent HTTP/2 channel) or "rest"
+GOOGLE_API_TRANSPORT = os.getenv("GOOGLE_API_TRANSPORT", "grpc")
 
 # RAG Configuration
 VECTORSTORE_PATH = BASE_DIR / "vectorstore" / "sermons_vectorstore"
 DATASET_PATH = BASE_DIR / "dataset" / "RLCF-Pitts.csv"
 
+# Embedding requests sent while building the vectorstore. 100 texts is the
+# most the Gemini batchEmbedContents endpoint accepts per request.
+EMBEDDING_BATCH_SIZE = 100
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "8"))
+
+# FAISS index built by _create_vectorstore. Leave FAISS_INDEX_FACTORY empty
+# to pick automatically: an IVF index from FAISS_IVF_MIN_VECTORS chunks, an
+# exhaustive fp16 index below. FAISS_IVF_ENCODING selects the IVF codes: "SQ8"
+# (8-bit scalar quantization, 1 byte per dimension), "SQfp16" (half-precision
+# floats, 2 bytes per dimension) or "PQ" (32-byte product quantization). SQ8
+# is the default: on 768-d embeddings of the sermon chunks it ranked like an
+# unquantized IVF index, while PQ kept only about 60% of its top 5 results.
+FAISS_INDEX_FACTORY = os.getenv("FAISS_INDEX_FACTORY", "")
+FAISS_IVF_ENCODING = os.getenv("FAISS_IVF_ENCODING", "SQ8")
+FAISS_IVF_MIN_VECTORS = 10_000
+FAISS_NLIST = 1024
+FAISS_PQ_M = 32
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_TRAIN_SIZE = 100_000
+
+# Graph parameters for HNSW indexes (e.g. FAISS_INDEX_FACTORY="HNSW32"):
+# candidate list size while inserting vectors and while searching
+FAISS_HNSW_EF_CONSTRUCTION = 200
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+
+# gunicorn worker count (see Dockerfile); FAISS threads are split between them
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "2"))
+
+# Number of loaded vectorstores kept in memory per process
+CACHED_VC_NUM = int(os.getenv("CACHED_VC_NUM", "4"))
+
+# Number of question embeddings memoized per process
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+# Number of retrieval results memoized per process, keyed by normalized question
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+
+# Seconds a generated answer stays in Django's cache (the default local-memory
+# cache is per process; configure CACHES to share answers between workers)
+ANSWER_CACHE_TIMEOUT = int(os.getenv("ANSWER_CACHE_TIMEOUT", "3600"))
+
+# Path prefixes RAGReadinessMiddleware holds back until the RAG service is ready
+RAG_URL_PREFIXES = ("/query/", "/api/query/")
+
+# Retrieval-only queries run by RAGWarmupMiddleware after startup
+WARMUP_QUERIES = [
+    "What does the Bible say about faith?",
+    "Who is Jesus?",
+    "How can I overcome sin?",
+    "What does it mean to be filled with the Holy Spirit?",
+    "How should we pray?",
+]
+
 # Logging configuration
 LOGGING = {
     "version": 1,
@@ -208,6 +263,11 @@ LOGGING = {
             "level": "INFO",
             "propagate": False,
         },
+        "rag": {
+            "handlers": ["console", "file"],
+            "level": os.getenv("RAG_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
     },
 }
 